@@ -1,160 +1,184 @@
 import re
 import string
-from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from heapq import nlargest
+from itertools import chain, groupby, islice, repeat
+from operator import itemgetter
+from datetime import date, datetime, timedelta
 from collections import Counter, defaultdict
-from typing import List, Dict, Any, Tuple, Optional
+from functools import cache
+from typing import List, Dict, Any, Tuple, Optional, Iterable, NamedTuple
+from utils import EMOJI_RE
+
+# Runs of 3+ word characters; folds punctuation stripping and the length filter into one scan
+_WORD_RE = re.compile(r'\w{3,}')
+
+# Read-only vocabularies shared by every ChatAnalyzer instance
+# Common English stopwords (no NLTK dependency)
+_STOP_WORDS = frozenset({'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'through', 'during', 'before', 'after', 'above', 'below', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'will', 'would', 'should', 'could', 'can', 'may', 'might', 'must', 'shall', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very'})
+_AFFECTIONATE_WORDS = frozenset({'love', 'loved', 'loving', 'heart', 'hearts', 'romantic', 'romance', 'passion', 'passionate', 'intimate', 'intimacy', 'hugs', 'hug', 'kiss', 'kisses', 'kissing', 'tender', 'tenderness', 'gentle', 'gentleness', 'warm', 'warmth', 'comfort', 'comforting', 'sweet', 'sweeter', 'sweetest', 'cute', 'cuter', 'cutest', 'beautiful', 'gorgeous', 'darling', 'dear', 'honey', 'baby', 'babe', 'sweetheart', 'beloved', 'treasure', 'angel', 'prince', 'princess', 'amazing', 'wonderful', 'fantastic', 'awesome', 'perfect', 'incredible', 'unbelievable', 'extraordinary', 'remarkable', 'precious', 'special', 'unique', 'irreplaceable', 'valuable', 'miss', 'missing', 'care', 'caring', 'adore', 'adoring', 'cherish', 'cherishing', 'fond', 'fondness', 'affection', 'affectionate', 'secure', 'security', 'trust', 'trusting', 'faithful', 'faithfulness', 'loyal', 'loyalty', 'devoted', 'devotion', 'commitment', 'together', 'forever', 'always', 'promise', 'promises', 'dream', 'dreams', 'hope', 'hopes', 'wish', 'wishes', 'blessed', 'blessing', 'grateful', 'gratitude', 'thankful', 'appreciate', 'appreciation', 'jaan', 'bro', 'bestie', 'dude', 'buddy', 'friend', 'mate', 'pal'})
+_AFFECTIONATE_EMOJIS = frozenset({'❤️', '💕', '💖', '💗', '💘', '💝', '💞', '💟', '💌', '💋', '😍', '🥰', '😘', '🤗', '🤩', '😊', '😌', '🥺', '😇', '💯', '✨', '🌟', '💫', '🌈', '🦄', '🌸', '🌺', '🌻', '🌷', '🌹', '🌼', '💐', '🎀', '🎁', '💎', '🏆', '🥇', '👑', '💍'})
+_CONVERSATION_STARTERS = frozenset({'hey', 'hi', 'hello', 'hii', 'hiii', 'hiiii', 'hiiiii', 'yo', 'yoo', 'yooo', 'sup', 'whats up', "what's up", 'wassup', 'howdy', 'greetings', 'good morning', 'good afternoon', 'good evening', 'gm', 'gn', 'good night', 'goodnight'})
+_POSITIVE_EMOJIS = frozenset({'😊', '😄', '😃', '😁', '😆', '😂', '🤣', '😍', '🥰', '😘', '❤️', '💕', '💖', '💗', '💝', '✨', '🌟', '💫', '🌈', '🎉', '🎊', '👍', '👏', '🙌', '🔥', '💯'})
+_NEGATIVE_EMOJIS = frozenset({'😢', '😭', '😔', '😞', '😟', '😕', '🙁', '☹️', '😠', '😡', '😤', '😒', '😑', '😐', '😶', '💔', '😰', '😨', '😱', '😖', '😣', '😫', '😩'})
+_POSITIVE_WORDS = frozenset({'love', 'amazing', 'wonderful', 'great', 'awesome', 'fantastic', 'perfect', 'beautiful', 'sweet', 'cute', 'happy', 'excited', 'joy', 'smile', 'laugh', 'fun', 'good', 'best', 'excellent', 'brilliant'})
+_NEGATIVE_WORDS = frozenset({'hate', 'terrible', 'awful', 'bad', 'sad', 'angry', 'upset', 'disappointed', 'frustrated', 'annoyed', 'worried', 'scared', 'hurt', 'pain', 'cry', 'sick', 'tired', 'bored', 'stupid', 'dumb'})
+# Emotional tone reads a little more into casual replies than the base sentiment vocabulary
+_TONE_POSITIVE_EMOJIS = _POSITIVE_EMOJIS | {'😇', '🥺', '😌'}
+_TONE_POSITIVE_WORDS = _POSITIVE_WORDS | {'yay', 'yes', 'yeah', 'cool', 'nice'}
+_TONE_NEGATIVE_WORDS = _NEGATIVE_WORDS | {'no', 'nope', 'ugh', 'ughh'}
+# Token -> +1/-1 (the positive and negative vocabularies are disjoint); a message leans whichever way its summed polarity does
+_TONE_POLARITY = {**dict.fromkeys(_TONE_POSITIVE_WORDS | _TONE_POSITIVE_EMOJIS, 1), **dict.fromkeys(_TONE_NEGATIVE_WORDS | _NEGATIVE_EMOJIS, -1)}
+_MOOD_POLARITY = {**dict.fromkeys(_POSITIVE_WORDS, 1), **dict.fromkeys(_NEGATIVE_WORDS, -1)}
+
+# Keyword vocabularies for topic detection
+_TOPIC_KEYWORDS = {'work': frozenset({'work', 'job', 'office', 'meeting', 'project', 'boss', 'colleague', 'deadline', 'presentation'}), 'food': frozenset({'food', 'eat', 'eating', 'hungry', 'restaurant', 'cooking', 'recipe', 'delicious', 'tasty', 'meal', 'dinner', 'lunch', 'breakfast'}), 'travel': frozenset({'travel', 'trip', 'vacation', 'flight', 'hotel', 'beach', 'mountain', 'city', 'country', 'visit', 'explore'}), 'entertainment': frozenset({'movie', 'film', 'show', 'series', 'music', 'song', 'book', 'game', 'fun', 'entertainment', 'watch', 'listen'}), 'family': frozenset({'family', 'mom', 'dad', 'mother', 'father', 'sister', 'brother', 'parent', 'relative', 'home'}), 'health': frozenset({'health', 'sick', 'ill', 'doctor', 'medicine', 'exercise', 'gym', 'fitness', 'pain', 'better', 'well'}), 'shopping': frozenset({'buy', 'shopping', 'store', 'price', 'expensive', 'cheap', 'money', 'pay', 'card', 'cash'}), 'technology': frozenset({'phone', 'computer', 'internet', 'app', 'software', 'tech', 'device', 'online', 'digital'})}
+# Inverse index: every keyword belongs to exactly one topic
+_TOPIC_BY_WORD = {word: topic for topic, keywords in _TOPIC_KEYWORDS.items() for word in keywords}
+_TOPIC_RANK = {topic: rank for rank, topic in enumerate(_TOPIC_KEYWORDS)}
+
+# datetime.weekday() index -> name, matching strftime('%A') without the per-call formatting
+_DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Response-time buckets in minutes: < 1 is 'instant', < 5 'very_fast', ..., >= 1440 'delivered'
+_RESPONSE_BUCKET_BOUNDS = (1, 5, 15, 60, 180, 1440)
+_RESPONSE_BUCKETS = ('instant', 'very_fast', 'fast', 'medium', 'slow', 'very_slow', 'delivered')
+
+class PreparedChat(NamedTuple):
+    # Per-message features derived once in ChatAnalyzer._prepare, index-aligned with messages
+    messages: List[Dict[str, Any]]
+    senders: List[str]
+    sender_ids: List[int]  # index into unique_senders
+    unique_senders: List[str]  # in order of first appearance
+    timestamps: List[datetime]
+    lower_texts: List[str]
+    words: List[List[str]]
+    emojis: List[List[str]]
+    hours: List[int]
+    weekdays: List[int]
+    days: List[int]  # date ordinal, so day differences are plain subtraction
+    date_keys: List[str]  # 'YYYY-MM-DD'
+    gaps: List[float]  # minutes since the previous message, 0.0 for the first
 
 class ChatAnalyzer:
 
     def __init__(self) -> None:
-        # Common English stopwords (no NLTK dependency)
-        self.stop_words = {'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'through', 'during', 'before', 'after', 'above', 'below', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'will', 'would', 'should', 'could', 'can', 'may', 'might', 'must', 'shall', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very'}
-        self.affectionate_words = {'love', 'loved', 'loving', 'heart', 'hearts', 'romantic', 'romance', 'passion', 'passionate', 'intimate', 'intimacy', 'hugs', 'hug', 'kiss', 'kisses', 'kissing', 'tender', 'tenderness', 'gentle', 'gentleness', 'warm', 'warmth', 'comfort', 'comforting', 'sweet', 'sweeter', 'sweetest', 'cute', 'cuter', 'cutest', 'beautiful', 'gorgeous', 'darling', 'dear', 'honey', 'baby', 'babe', 'sweetheart', 'beloved', 'treasure', 'angel', 'prince', 'princess', 'amazing', 'wonderful', 'fantastic', 'awesome', 'perfect', 'incredible', 'unbelievable', 'extraordinary', 'remarkable', 'precious', 'special', 'unique', 'irreplaceable', 'valuable', 'miss', 'missing', 'care', 'caring', 'adore', 'adoring', 'cherish', 'cherishing', 'fond', 'fondness', 'affection', 'affectionate', 'secure', 'security', 'trust', 'trusting', 'faithful', 'faithfulness', 'loyal', 'loyalty', 'devoted', 'devotion', 'commitment', 'together', 'forever', 'always', 'promise', 'promises', 'dream', 'dreams', 'hope', 'hopes', 'wish', 'wishes', 'blessed', 'blessing', 'grateful', 'gratitude', 'thankful', 'appreciate', 'appreciation', 'jaan', 'bro', 'bestie', 'dude', 'buddy', 'friend', 'mate', 'pal'}
-        self.conversation_starters = ['hey', 'hi', 'hello', 'hii', 'hiii', 'hiiii', 'hiiiii', 'yo', 'yoo', 'yooo', 'sup', 'whats up', "what's up", 'wassup', 'howdy', 'greetings', 'good morning', 'good afternoon', 'good evening', 'gm', 'gn', 'good night', 'goodnight']
-        self.emoji_pattern = re.compile('[😀-🙏🌀-🗿🚀-\U0001f6ff\U0001f1e0-🇿✂-➰Ⓜ-🉑]+', flags=re.UNICODE)
+        self.stop_words = _STOP_WORDS
+        self.affectionate_words = _AFFECTIONATE_WORDS
+        self.conversation_starters = _CONVERSATION_STARTERS
+        self.emoji_pattern = EMOJI_RE
 
-    def analyze_chat(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_chat(self, messages: List[Dict[str, Any]], sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         if not messages:
             return {}
-        total_messages = len(messages)
-        senders = list(set((msg['sender'] for msg in messages)))
-        message_counts = Counter((msg['sender'] for msg in messages))
-        word_counts = self._calculate_word_counts(messages)
-        emoji_stats = self._analyze_emoji_personality(messages)
-        timing_stats = self._analyze_time_patterns(messages)
-        conversation_starters = self._analyze_conversation_starters_detailed(messages)
-        return {'basic_stats': {'total_messages': total_messages, 'senders': senders, 'message_counts': dict(message_counts), 'word_counts': word_counts, 'date_range': self._get_date_range(messages)}, 'balance_of_effort': self._analyze_balance_of_effort(messages, message_counts, word_counts), 'conversation_starters': conversation_starters, 'response_time_analysis': self._analyze_response_times_detailed(messages), 'time_analysis': timing_stats, 'emotional_tone': self._analyze_emotional_tone(messages), 'sentiment_analysis': self._analyze_emotional_tone(messages), 'emoji_personality': emoji_stats, 'emoji_stats': emoji_stats, 'message_length_stats': self._analyze_message_lengths(messages), 'conversation_flow': self._analyze_conversation_flow(messages), 'activity_patterns': self._analyze_activity_patterns(messages), 'keyword_tracker': self._analyze_keywords(messages), 'milestones': self._find_milestones(messages), 'affection_score': self._calculate_affection_score(messages), 'mood_timeline': self._analyze_mood_timeline(messages), 'topic_detector': self._detect_topics(messages), 'streaks_gaps': self._analyze_streaks_gaps(messages), 'compatibility_index': self._calculate_compatibility_index(messages, message_counts, word_counts), 'personality_insights': self._generate_personality_insights(messages, message_counts, word_counts), 'who_thinks_first': self._analyze_who_thinks_first(messages), 'fun_metrics': self._calculate_fun_metrics(messages, word_counts, emoji_stats, timing_stats, conversation_starters.get('conversation_starts', {})), 'affinity_scores': self._calculate_affinity_scores(messages)}
-
-    def _calculate_word_counts(self, messages: List[Dict[str, Any]]) -> Dict[str, int]:
-        word_counts = defaultdict(int)
-        for msg in messages:
-            sender = msg['sender']
-            words = self._extract_words(msg['message'])
-            word_counts[sender] += len(words)
-        return dict(word_counts)
-
-    def _extract_words(self, text: str) -> List[str]:
-        text = re.sub('[^\\w\\s]', ' ', text)
-        words = text.lower().split()
-        words = [word for word in words if word not in self.stop_words and len(word) > 2]
-        return words
-
-    def _analyze_emojis(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        emoji_counts = defaultdict(int)
-        sender_emoji_counts = defaultdict(lambda: defaultdict(int))
-        total_emojis = 0
-        for msg in messages:
-            sender = msg['sender']
-            message = msg['message']
-            emojis = self.emoji_pattern.findall(message)
-            for emoji in emojis:
-                emoji_counts[emoji] += 1
-                sender_emoji_counts[sender][emoji] += 1
-                total_emojis += 1
-        top_emojis = dict(Counter(emoji_counts).most_common(20))
-        sender_emoji_totals = {sender: sum(counts.values()) for sender, counts in sender_emoji_counts.items()}
-        return {'total_emojis': total_emojis, 'unique_emojis': len(emoji_counts), 'top_emojis': top_emojis, 'sender_emoji_counts': dict(sender_emoji_totals), 'sender_emoji_details': {sender: dict(counts) for sender, counts in sender_emoji_counts.items()}}
-
-    def _analyze_timing(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        hourly_counts = defaultdict(int)
-        daily_counts = defaultdict(int)
-        sender_hourly = defaultdict(lambda: defaultdict(int))
-        sender_daily = defaultdict(lambda: defaultdict(int))
+        prepared = self._prepare(messages)
+        senders = prepared.unique_senders
+        message_counts = Counter(prepared.senders)
+        # Intermediates shared by several sections are built on first use, so a narrow sections filter skips them entirely
+        word_counts = cache(lambda: self._calculate_word_counts(prepared))
+        emoji_stats = cache(lambda: self._analyze_emoji_personality(prepared))
+        timing_stats = cache(lambda: self._analyze_time_patterns(prepared))
+        conversation_starters = cache(lambda: self._analyze_conversation_starters_detailed(prepared))
+        emotional_tone = cache(lambda: self._analyze_emotional_tone(prepared))
+        affection_totals = cache(lambda: self._sum_affection(prepared))
+        affection = cache(lambda: self._calculate_affection_score(affection_totals(), message_counts))
+        response_times = cache(lambda: self._analyze_response_times_detailed(prepared))
+        builders = {'basic_stats': lambda: {'total_messages': len(messages), 'senders': senders, 'message_counts': dict(message_counts), 'word_counts': word_counts(), 'date_range': self._get_date_range(prepared)}, 'balance_of_effort': lambda: self._analyze_balance_of_effort(messages, message_counts, word_counts()), 'conversation_starters': conversation_starters, 'response_time_analysis': response_times, 'time_analysis': timing_stats, 'emotional_tone': emotional_tone, 'sentiment_analysis': emotional_tone, 'emoji_personality': emoji_stats, 'emoji_stats': emoji_stats, 'message_length_stats': lambda: self._analyze_message_lengths(messages), 'conversation_flow': lambda: self._analyze_conversation_flow(prepared), 'activity_patterns': lambda: self._analyze_activity_patterns(prepared), 'keyword_tracker': lambda: self._analyze_keywords(prepared), 'milestones': lambda: self._find_milestones(prepared), 'affection_score': affection, 'mood_timeline': lambda: self._analyze_mood_timeline(prepared), 'topic_detector': lambda: self._detect_topics(prepared), 'streaks_gaps': lambda: self._analyze_streaks_gaps(prepared), 'compatibility_index': lambda: self._calculate_compatibility_index(message_counts, word_counts(), affection()['affection_scores'], response_times()['average_response_times']), 'personality_insights': lambda: self._generate_personality_insights(message_counts, word_counts(), emoji_stats(), affection()['affection_scores'], timing_stats()), 'who_thinks_first': lambda: self._analyze_who_thinks_first(prepared), 'fun_metrics': lambda: self._calculate_fun_metrics(senders, message_counts, word_counts(), emoji_stats(), timing_stats(), conversation_starters().get('conversation_starts', {})), 'affinity_scores': lambda: self._calculate_affinity_scores(affection_totals(), message_counts)}
+        if sections is not None:
+            requested = set(sections)
+            builders = {name: build for name, build in builders.items() if name in requested}
+        return {name: build() for name, build in builders.items()}
+
+    def _prepare(self, messages: List[Dict[str, Any]]) -> PreparedChat:
+        senders = []
+        sender_ids = []
+        sender_index = {}
+        timestamps = []
+        lower_texts = []
+        words = []
+        emojis = []
+        hours = []
+        weekdays = []
+        days = []
+        date_keys = []
+        day_keys = {}
+        gaps = []
+        # Short replies ("ok", "lol", media placeholders) repeat a lot, so tokenize each distinct text once
+        text_features = {}
+        prev_timestamp = messages[0]['timestamp']
         for msg in messages:
-            sender = msg['sender']
+            text = msg['message']
             timestamp = msg['timestamp']
-            hour = timestamp.hour
-            day = timestamp.strftime('%A')
-            hourly_counts[hour] += 1
-            daily_counts[day] += 1
-            sender_hourly[sender][hour] += 1
-            sender_daily[sender][day] += 1
-        most_active_hour = max(hourly_counts.items(), key=lambda x: x[1])[0]
-        most_active_day = max(daily_counts.items(), key=lambda x: x[1])[0]
-        late_night_messages = sum((hourly_counts.get(hour, 0) for hour in range(0, 4)))
-        return {'hourly_distribution': dict(hourly_counts), 'daily_distribution': dict(daily_counts), 'most_active_hour': most_active_hour, 'most_active_day': most_active_day, 'late_night_messages': late_night_messages, 'sender_hourly': {sender: dict(hours) for sender, hours in sender_hourly.items()}, 'sender_daily': {sender: dict(days) for sender, days in sender_daily.items()}}
-
-    def _analyze_response_times(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        response_times = defaultdict(list)
-        for i in range(1, len(messages)):
-            prev_msg = messages[i - 1]
-            curr_msg = messages[i]
-            if prev_msg['sender'] != curr_msg['sender']:
-                time_diff = (curr_msg['timestamp'] - prev_msg['timestamp']).total_seconds() / 60
-                if 0 < time_diff < 1440:
-                    response_times[curr_msg['sender']].append(time_diff)
-        avg_response_times = {}
-        for sender, times in response_times.items():
-            if times:
-                avg_response_times[sender] = sum(times) / len(times)
-        return {'average_response_times': avg_response_times, 'response_time_details': dict(response_times)}
-
-    def _analyze_common_words(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        all_words = []
-        sender_words = defaultdict(list)
-        for msg in messages:
             sender = msg['sender']
-            words = self._extract_words(msg['message'])
-            all_words.extend(words)
-            sender_words[sender].extend(words)
-        word_freq = Counter(all_words)
-        common_words = dict(word_freq.most_common(50))
-        sender_common_words = {}
-        for sender, words in sender_words.items():
-            word_freq = Counter(words)
-            sender_common_words[sender] = dict(word_freq.most_common(20))
-        return {'overall_common_words': common_words, 'sender_common_words': sender_common_words}
-
-    def _analyze_conversation_starters(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        conversation_starts = defaultdict(int)
-        time_gap_threshold = 30
-        for i in range(1, len(messages)):
-            prev_msg = messages[i - 1]
-            curr_msg = messages[i]
-            time_gap = (curr_msg['timestamp'] - prev_msg['timestamp']).total_seconds() / 60
-            if time_gap > time_gap_threshold:
-                conversation_starts[curr_msg['sender']] += 1
-        if messages:
-            conversation_starts[messages[0]['sender']] += 1
-        return dict(conversation_starts)
-
-    def _calculate_fun_metrics(self, messages: List[Dict[str, Any]], word_counts: Dict[str, int], emoji_stats: Dict[str, Any], timing_stats: Dict[str, Any], conversation_starters: Dict[str, Any]) -> Dict[str, Any]:
-        senders = list(set((msg['sender'] for msg in messages)))
-        message_counts = Counter((msg['sender'] for msg in messages))
-        message_leader = max(message_counts.items(), key=lambda x: x[1])[0]
-        word_leader = max(word_counts.items(), key=lambda x: x[1])[0] if word_counts else senders[0]
-        emoji_leader = max(emoji_stats['sender_emoji_counts'].items(), key=lambda x: x[1])[0] if emoji_stats['sender_emoji_counts'] else senders[0]
-        initiator_leader = max(conversation_starters.items(), key=lambda x: x[1])[0] if conversation_starters else senders[0]
+            senders.append(sender)
+            sender_ids.append(sender_index.setdefault(sender, len(sender_index)))
+            timestamps.append(timestamp)
+            features = text_features.get(text)
+            if features is None:
+                lower_text = text.lower()
+                # Every emoji is outside ASCII, and isascii() is a constant-time flag check, so plain-text messages skip the regex
+                features = text_features[text] = (lower_text, self._extract_words_from_lower(lower_text), [] if text.isascii() else self.emoji_pattern.findall(text))
+            lower_texts.append(features[0])
+            words.append(features[1])
+            emojis.append(features[2])
+            hours.append(timestamp.hour)
+            weekdays.append(timestamp.weekday())
+            day = timestamp.toordinal()
+            date_key = day_keys.get(day)
+            if date_key is None:
+                date_key = day_keys[day] = timestamp.strftime('%Y-%m-%d')
+            days.append(day)
+            date_keys.append(date_key)
+            gaps.append((timestamp - prev_timestamp).total_seconds() / 60)
+            prev_timestamp = timestamp
+        return PreparedChat(messages, senders, sender_ids, list(sender_index), timestamps, lower_texts, words, emojis, hours, weekdays, days, date_keys, gaps)
+
+    def _calculate_word_counts(self, prepared: PreparedChat) -> Dict[str, int]:
+        totals = [0] * len(prepared.unique_senders)
+        for sender_id, words in zip(prepared.sender_ids, prepared.words):
+            totals[sender_id] += len(words)
+        return dict(zip(prepared.unique_senders, totals))
+
+    def _extract_words_from_lower(self, lower_text: str) -> List[str]:
+        return [word for word in _WORD_RE.findall(lower_text) if word not in self.stop_words]
+
+    def _calculate_fun_metrics(self, senders: List[str], message_counts: Counter, word_counts: Dict[str, int], emoji_stats: Dict[str, Any], timing_stats: Dict[str, Any], conversation_starters: Dict[str, Any]) -> Dict[str, Any]:
+        message_leader = max(message_counts, key=message_counts.get)
+        word_leader = max(word_counts, key=word_counts.get) if word_counts else senders[0]
+        sender_emoji_counts = emoji_stats['sender_emoji_counts']
+        emoji_leader = max(sender_emoji_counts, key=sender_emoji_counts.get) if sender_emoji_counts else senders[0]
+        initiator_leader = max(conversation_starters, key=conversation_starters.get) if conversation_starters else senders[0]
         night_owl_scores = {}
         for sender in senders:
             late_night_count = sum((timing_stats['sender_hourly'].get(sender, {}).get(hour, 0) for hour in range(0, 6)))
             night_owl_scores[sender] = late_night_count
-        night_owl = max(night_owl_scores.items(), key=lambda x: x[1])[0] if night_owl_scores else senders[0]
+        night_owl = max(night_owl_scores, key=night_owl_scores.get) if night_owl_scores else senders[0]
         return {'message_leader': message_leader, 'word_leader': word_leader, 'emoji_leader': emoji_leader, 'initiator_leader': initiator_leader, 'night_owl': night_owl, 'night_owl_scores': night_owl_scores}
 
-    def _calculate_affinity_scores(self, messages: List[Dict[str, Any]]) -> Dict[str, float]:
+    def _sum_affection(self, prepared: PreparedChat) -> Dict[str, float]:
+        # Per-sender sum of each message's affectionate-token ratio; shared by the affection score and affinity scores
         sender_scores = defaultdict(float)
-        for msg in messages:
-            sender = msg['sender']
-            message = msg['message'].lower()
-            words = self._extract_words(message)
-            affectionate_count = sum((1 for word in words if word in self.affectionate_words))
-            affectionate_emojis = ['❤️', '💕', '💖', '💗', '💘', '💝', '💞', '💟', '💌', '💋', '😍', '🥰', '😘', '🤗', '🤩', '😊', '😌', '🥺', '😇', '💯', '✨', '🌟', '💫', '🌈', '🦄', '🌸', '🌺', '🌻', '🌷', '🌹', '🌼', '💐', '🎀', '🎁', '💎', '🏆', '🥇', '👑', '💍', '💐', '🌹', '🌺', '🌸', '🌻', '🌷', '🌼', '💐', '🎀', '🎁', '💎', '🏆', '🥇', '👑', '💍']
-            emoji_count = sum((1 for emoji in self.emoji_pattern.findall(message) if emoji in affectionate_emojis))
-            message_length = len(words) if words else 1
-            score = (affectionate_count + emoji_count) / message_length
+        # The ratio depends only on the (lowercased) text, so repeated messages are scored once
+        text_scores = {}
+        for sender, lower_text, words, emojis in zip(prepared.senders, prepared.lower_texts, prepared.words, prepared.emojis):
+            score = text_scores.get(lower_text)
+            if score is None:
+                affectionate_count = sum(map(self.affectionate_words.__contains__, words)) + sum(map(_AFFECTIONATE_EMOJIS.__contains__, emojis))
+                score = text_scores[lower_text] = affectionate_count / (len(words) or 1)
             sender_scores[sender] += score
-        total_messages = Counter((msg['sender'] for msg in messages))
+        return sender_scores
+
+    def _calculate_affinity_scores(self, sender_scores: Dict[str, float], message_counts: Counter) -> Dict[str, float]:
         normalized_scores = {}
         for sender, score in sender_scores.items():
-            message_count = total_messages[sender]
+            message_count = message_counts[sender]
             normalized_scores[sender] = score / message_count * 100 if message_count > 0 else 0
         return normalized_scores
 
-    def _get_date_range(self, messages: List[Dict[str, Any]]) -> Dict[str, str]:
-        if not messages:
+    def _get_date_range(self, prepared: PreparedChat) -> Dict[str, str]:
+        timestamps = prepared.timestamps
+        if not timestamps:
             return {}
-        timestamps = [msg['timestamp'] for msg in messages]
         start_date = min(timestamps)
         end_date = max(timestamps)
         return {'start': start_date.strftime('%Y-%m-%d'), 'end': end_date.strftime('%Y-%m-%d'), 'duration_days': (end_date - start_date).days}
@@ -168,74 +192,43 @@ class ChatAnalyzer:
         stats = {}
         for sender, lengths in sender_lengths.items():
             if lengths:
-                stats[sender] = {'avg_length': sum(lengths) / len(lengths), 'min_length': min(lengths), 'max_length': max(lengths), 'median_length': sorted(lengths)[len(lengths) // 2]}
+                lengths.sort()
+                count = len(lengths)
+                stats[sender] = {'avg_length': sum(lengths) / count, 'min_length': lengths[0], 'max_length': lengths[-1], 'median_length': lengths[count // 2]}
         return stats
 
-    def _analyze_conversation_flow(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        if len(messages) < 2:
+    def _analyze_conversation_flow(self, prepared: PreparedChat) -> Dict[str, Any]:
+        if len(prepared.senders) < 2:
             return {}
-        turns = []
-        current_sender = messages[0]['sender']
-        turn_length = 1
-        for i in range(1, len(messages)):
-            if messages[i]['sender'] == current_sender:
-                turn_length += 1
-            else:
-                turns.append({'sender': current_sender, 'length': turn_length})
-                current_sender = messages[i]['sender']
-                turn_length = 1
-        turns.append({'sender': current_sender, 'length': turn_length})
         sender_turns = defaultdict(list)
-        for turn in turns:
-            sender_turns[turn['sender']].append(turn['length'])
+        total_turns = 0
+        for sender, run in groupby(prepared.senders):
+            sender_turns[sender].append(len(list(run)))
+            total_turns += 1
         turn_stats = {}
         for sender, turn_lengths in sender_turns.items():
             if turn_lengths:
                 turn_stats[sender] = {'avg_turn_length': sum(turn_lengths) / len(turn_lengths), 'max_turn_length': max(turn_lengths), 'total_turns': len(turn_lengths)}
-        return {'turn_stats': turn_stats, 'total_turns': len(turns)}
-
-    def _analyze_sentiment(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        positive_emojis = ['😊', '😄', '😃', '😁', '😆', '😂', '🤣', '😍', '🥰', '😘', '❤️', '💕', '💖', '💗', '💝', '✨', '🌟', '💫', '🌈', '🎉', '🎊', '👍', '👏', '🙌', '🔥', '💯']
-        negative_emojis = ['😢', '😭', '😔', '😞', '😟', '😕', '🙁', '☹️', '😠', '😡', '😤', '😒', '😑', '😐', '😶', '💔', '😰', '😨', '😱', '😖', '😣', '😫', '😩']
-        positive_words = ['love', 'amazing', 'wonderful', 'great', 'awesome', 'fantastic', 'perfect', 'beautiful', 'sweet', 'cute', 'happy', 'excited', 'joy', 'smile', 'laugh', 'fun', 'good', 'best', 'excellent', 'brilliant']
-        negative_words = ['hate', 'terrible', 'awful', 'bad', 'sad', 'angry', 'upset', 'disappointed', 'frustrated', 'annoyed', 'worried', 'scared', 'hurt', 'pain', 'cry', 'sick', 'tired', 'bored', 'stupid', 'dumb']
-        sender_sentiments = defaultdict(lambda: {'positive': 0, 'negative': 0, 'neutral': 0})
-        for msg in messages:
-            sender = msg['sender']
-            message = msg['message'].lower()
-            emojis = self.emoji_pattern.findall(msg['message'])
-            positive_emoji_count = sum((1 for emoji in emojis if emoji in positive_emojis))
-            negative_emoji_count = sum((1 for emoji in emojis if emoji in negative_emojis))
-            words = self._extract_words(msg['message'])
-            positive_word_count = sum((1 for word in words if word in positive_words))
-            negative_word_count = sum((1 for word in words if word in negative_words))
-            positive_score = positive_emoji_count + positive_word_count
-            negative_score = negative_emoji_count + negative_word_count
-            if positive_score > negative_score:
-                sender_sentiments[sender]['positive'] += 1
-            elif negative_score > positive_score:
-                sender_sentiments[sender]['negative'] += 1
-            else:
-                sender_sentiments[sender]['neutral'] += 1
-        sentiment_percentages = {}
-        for sender, sentiments in sender_sentiments.items():
-            total = sum(sentiments.values())
-            if total > 0:
-                sentiment_percentages[sender] = {'positive': sentiments['positive'] / total * 100, 'negative': sentiments['negative'] / total * 100, 'neutral': sentiments['neutral'] / total * 100}
-        return sentiment_percentages
-
-    def _analyze_activity_patterns(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        weekly_activity = defaultdict(int)
-        monthly_activity = defaultdict(int)
-        for msg in messages:
-            timestamp = msg['timestamp']
-            week_key = timestamp.strftime('%Y-W%U')
-            month_key = timestamp.strftime('%Y-%m')
-            weekly_activity[week_key] += 1
-            monthly_activity[month_key] += 1
-        most_active_week = max(weekly_activity.items(), key=lambda x: x[1]) if weekly_activity else ('', 0)
-        most_active_month = max(monthly_activity.items(), key=lambda x: x[1]) if monthly_activity else ('', 0)
-        return {'weekly_activity': dict(weekly_activity), 'monthly_activity': dict(monthly_activity), 'most_active_week': most_active_week[0], 'most_active_month': most_active_month[0], 'avg_messages_per_week': sum(weekly_activity.values()) / len(weekly_activity) if weekly_activity else 0, 'avg_messages_per_month': sum(monthly_activity.values()) / len(monthly_activity) if monthly_activity else 0}
+        return {'turn_stats': turn_stats, 'total_turns': total_turns}
+
+    def _analyze_activity_patterns(self, prepared: PreparedChat) -> Dict[str, Any]:
+        week_counts = Counter()
+        month_counts = Counter()
+        year_starts = {}
+        for timestamp, weekday, day in zip(prepared.timestamps, prepared.weekdays, prepared.days):
+            year = timestamp.year
+            year_start = year_starts.get(year)
+            if year_start is None:
+                year_start = year_starts[year] = date(year, 1, 1).toordinal()
+            # Same numbering as strftime('%U'): weeks start on Sunday, days before the first Sunday are week 0
+            week = (day - year_start + 7 - (weekday + 1) % 7) // 7
+            week_counts[(year, week)] += 1
+            month_counts[(year, timestamp.month)] += 1
+        weekly_activity = {f'{year}-W{week:02d}': count for (year, week), count in week_counts.items()}
+        monthly_activity = {f'{year}-{month:02d}': count for (year, month), count in month_counts.items()}
+        most_active_week = max(weekly_activity.items(), key=itemgetter(1)) if weekly_activity else ('', 0)
+        most_active_month = max(monthly_activity.items(), key=itemgetter(1)) if monthly_activity else ('', 0)
+        return {'weekly_activity': weekly_activity, 'monthly_activity': monthly_activity, 'most_active_week': most_active_week[0], 'most_active_month': most_active_month[0], 'avg_messages_per_week': sum(weekly_activity.values()) / len(weekly_activity) if weekly_activity else 0, 'avg_messages_per_month': sum(monthly_activity.values()) / len(monthly_activity) if monthly_activity else 0}
 
     def _analyze_balance_of_effort(self, messages: List[Dict[str, Any]], message_counts: Counter, word_counts: Dict[str, int]) -> Dict[str, Any]:
         total_messages = sum(message_counts.values())
@@ -245,8 +238,8 @@ class ChatAnalyzer:
             msg_percentage = message_counts[sender] / total_messages * 100 if total_messages > 0 else 0
             avg_word_length = word_counts[sender] / message_counts[sender] if message_counts[sender] > 0 else 0
             balance_data[sender] = {'message_percentage': round(msg_percentage, 1), 'avg_word_length': round(avg_word_length, 1), 'total_messages': message_counts[sender], 'total_words': word_counts[sender]}
-        message_leader = max(message_counts.items(), key=lambda x: x[1])[0]
-        word_leader = max(word_counts.items(), key=lambda x: x[1])[0] if word_counts else list(message_counts.keys())[0]
+        message_leader = max(message_counts, key=message_counts.get)
+        word_leader = max(word_counts, key=word_counts.get) if word_counts else list(message_counts.keys())[0]
         return {'balance_data': balance_data, 'message_leader': message_leader, 'word_leader': word_leader, 'insight': self._generate_balance_insight(balance_data, message_leader, word_leader)}
 
     def _generate_balance_insight(self, balance_data: Dict, message_leader: str, word_leader: str) -> str:
@@ -269,82 +262,79 @@ class ChatAnalyzer:
         else:
             return 'You both have a balanced conversation style'
 
-    def _analyze_conversation_starters_detailed(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_conversation_starters_detailed(self, prepared: PreparedChat) -> Dict[str, Any]:
+        messages = prepared.messages
+        senders = prepared.senders
+        lower_texts = prepared.lower_texts
+        gaps = prepared.gaps
         conversation_starts = defaultdict(int)
         starter_words = defaultdict(int)
         time_gap_threshold = 30
         for i in range(1, len(messages)):
-            prev_msg = messages[i - 1]
-            curr_msg = messages[i]
-            time_gap = (curr_msg['timestamp'] - prev_msg['timestamp']).total_seconds() / 60
-            if time_gap > time_gap_threshold:
-                conversation_starts[curr_msg['sender']] += 1
-                first_words = curr_msg['message'].lower().split()[:3]
+            if gaps[i] > time_gap_threshold:
+                conversation_starts[senders[i]] += 1
+                first_words = lower_texts[i].split()[:3]
                 for word in first_words:
                     if word in self.conversation_starters:
                         starter_words[word] += 1
         if messages:
             conversation_starts[messages[0]['sender']] += 1
-            first_words = messages[0]['message'].lower().split()[:3]
+            first_words = lower_texts[0].split()[:3]
             for word in first_words:
                 if word in self.conversation_starters:
                     starter_words[word] += 1
-        initiator_leader = max(conversation_starts.items(), key=lambda x: x[1])[0] if conversation_starts else 'Unknown'
-        top_starter = max(starter_words.items(), key=lambda x: x[1])[0] if starter_words else 'Hey'
+        initiator_leader = max(conversation_starts, key=conversation_starts.get) if conversation_starts else 'Unknown'
+        top_starter = max(starter_words, key=starter_words.get) if starter_words else 'Hey'
         return {'conversation_starts': dict(conversation_starts), 'starter_words': dict(starter_words), 'initiator_leader': initiator_leader, 'top_starter_word': top_starter, 'title': f'{initiator_leader} - The Icebreaker'}
 
-    def _analyze_response_times_detailed(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_response_times_detailed(self, prepared: PreparedChat) -> Dict[str, Any]:
+        senders = prepared.senders
+        sender_ids = prepared.sender_ids
+        gaps = prepared.gaps
         response_times = defaultdict(list)
-        response_distribution = defaultdict(int)
+        bucket_counts = Counter()
         delivered_status = defaultdict(int)
         median_response_times = {}
         percentile_response_times = {}
-        for i in range(1, len(messages)):
-            prev_msg = messages[i - 1]
-            curr_msg = messages[i]
-            if prev_msg['sender'] != curr_msg['sender']:
-                time_diff = (curr_msg['timestamp'] - prev_msg['timestamp']).total_seconds() / 60
+        for i in range(1, len(senders)):
+            if sender_ids[i - 1] != sender_ids[i]:
+                sender = senders[i]
+                time_diff = gaps[i]
                 if 0 < time_diff < 10080:
-                    response_times[curr_msg['sender']].append(time_diff)
-                    if time_diff < 1:
-                        response_distribution[f'{curr_msg['sender']}_instant'] += 1
-                    elif time_diff < 5:
-                        response_distribution[f'{curr_msg['sender']}_very_fast'] += 1
-                    elif time_diff < 15:
-                        response_distribution[f'{curr_msg['sender']}_fast'] += 1
-                    elif time_diff < 60:
-                        response_distribution[f'{curr_msg['sender']}_medium'] += 1
-                    elif time_diff < 180:
-                        response_distribution[f'{curr_msg['sender']}_slow'] += 1
-                    elif time_diff < 1440:
-                        response_distribution[f'{curr_msg['sender']}_very_slow'] += 1
-                        delivered_status[curr_msg['sender']] += 1
-                    else:
-                        response_distribution[f'{curr_msg['sender']}_delivered'] += 1
-                        delivered_status[curr_msg['sender']] += 1
+                    response_times[sender].append(time_diff)
+                    bucket_counts[(sender, bisect_right(_RESPONSE_BUCKET_BOUNDS, time_diff))] += 1
+                    if time_diff >= 180:
+                        delivered_status[sender] += 1
+        # Format each '{sender}_{bucket}' key once per distinct pair rather than once per response
+        response_distribution = {f'{sender}_{_RESPONSE_BUCKETS[bucket]}': count for (sender, bucket), count in bucket_counts.items()}
         avg_response_times = {}
+        sorted_response_times = {}
         for sender, times in response_times.items():
             if times:
                 sorted_times = sorted(times)
-                avg_response_times[sender] = round(sum(times) / len(times), 1)
-                median_response_times[sender] = round(sorted_times[len(sorted_times) // 2], 1)
-                percentile_response_times[sender] = {'p25': round(sorted_times[len(sorted_times) // 4], 1), 'p75': round(sorted_times[int(len(sorted_times) * 0.75)], 1), 'p90': round(sorted_times[int(len(sorted_times) * 0.9)], 1), 'min': round(min(times), 1), 'max': round(max(times), 1)}
-        fastest_responder = min(avg_response_times.items(), key=lambda x: x[1])[0] if avg_response_times else None
-        slowest_responder = max(avg_response_times.items(), key=lambda x: x[1])[0] if avg_response_times else None
-        most_delivered = max(delivered_status.items(), key=lambda x: x[1])[0] if delivered_status else None
-        response_speed_analysis = self._analyze_response_speed_patterns(response_times)
+                count = len(sorted_times)
+                sorted_response_times[sender] = sorted_times
+                avg_response_times[sender] = round(sum(times) / count, 1)
+                median_response_times[sender] = round(sorted_times[count // 2], 1)
+                percentile_response_times[sender] = {'p25': round(sorted_times[count // 4], 1), 'p75': round(sorted_times[int(count * 0.75)], 1), 'p90': round(sorted_times[int(count * 0.9)], 1), 'min': round(sorted_times[0], 1), 'max': round(sorted_times[-1], 1)}
+        fastest_responder = min(avg_response_times, key=avg_response_times.get) if avg_response_times else None
+        slowest_responder = max(avg_response_times, key=avg_response_times.get) if avg_response_times else None
+        most_delivered = max(delivered_status, key=delivered_status.get) if delivered_status else None
+        response_speed_analysis = self._analyze_response_speed_patterns(sorted_response_times)
         return {'average_response_times': avg_response_times, 'median_response_times': median_response_times, 'percentile_response_times': percentile_response_times, 'response_distribution': dict(response_distribution), 'delivered_status': dict(delivered_status), 'fastest_responder': fastest_responder, 'slowest_responder': slowest_responder, 'most_delivered': most_delivered, 'speed_patterns': response_speed_analysis, 'insight': self._generate_enhanced_response_insight(avg_response_times, fastest_responder, slowest_responder, delivered_status)}
 
-    def _analyze_response_speed_patterns(self, response_times: Dict) -> Dict[str, Any]:
+    def _analyze_response_speed_patterns(self, sorted_response_times: Dict[str, List[float]]) -> Dict[str, Any]:
+        # Expects each sender's times in ascending order so bucket counts are binary searches
         speed_patterns = {}
-        for sender, times in response_times.items():
+        for sender, times in sorted_response_times.items():
             if not times:
                 continue
-            instant_responses = sum((1 for t in times if t < 1))
-            fast_responses = sum((1 for t in times if 1 <= t < 15))
-            delayed_responses = sum((1 for t in times if t >= 60))
             total_responses = len(times)
-            speed_patterns[sender] = {'instant_percent': round(instant_responses / total_responses * 100, 1), 'fast_percent': round(fast_responses / total_responses * 100, 1), 'delayed_percent': round(delayed_responses / total_responses * 100, 1), 'consistency_score': round(100 - (max(times) - min(times)) / 60, 1) if times else 0}
+            under_one_minute = bisect_left(times, 1)
+            instant_responses = under_one_minute
+            fast_responses = bisect_left(times, 15) - under_one_minute
+            delayed_responses = total_responses - bisect_left(times, 60)
+            speed_patterns[sender] = {'instant_percent': round(instant_responses / total_responses * 100, 1), 'fast_percent': round(fast_responses / total_responses * 100, 1), 'delayed_percent': round(delayed_responses / total_responses * 100, 1), 'consistency_score': round(100 - (times[-1] - times[0]) / 60, 1)}
         return speed_patterns
 
     def _generate_enhanced_response_insight(self, avg_times: Dict, fastest: str, slowest: str, delivered_status: Dict) -> str:
@@ -369,71 +359,47 @@ class ChatAnalyzer:
             else:
                 insights.append(f'{slowest} responds in {slow_time:.1f} min')
         if delivered_status:
-            most_delivered = max(delivered_status.items(), key=lambda x: x[1])[0]
+            most_delivered = max(delivered_status, key=delivered_status.get)
             delivered_count = delivered_status[most_delivered]
             if delivered_count > 5:
                 insights.append(f"{most_delivered} leaves {delivered_count} messages on 'delivered' status")
         return '. '.join(insights) if insights else 'Similar response patterns'
 
-    def _analyze_time_patterns(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        hourly_counts = defaultdict(int)
-        sender_hourly = defaultdict(lambda: defaultdict(int))
-        day_night_counts = defaultdict(int)
-        for msg in messages:
-            sender = msg['sender']
-            hour = msg['timestamp'].hour
-            hourly_counts[hour] += 1
-            sender_hourly[sender][hour] += 1
-            if 6 <= hour < 18:
-                day_night_counts[f'{sender}_day'] += 1
-            else:
-                day_night_counts[f'{sender}_night'] += 1
+    def _analyze_time_patterns(self, prepared: PreparedChat) -> Dict[str, Any]:
+        hourly_counts = Counter(prepared.hours)
+        sender_hourly = defaultdict(dict)
+        for (sender, hour), count in Counter(zip(prepared.senders, prepared.hours)).items():
+            sender_hourly[sender][hour] = count
+        day_night_counts = {}
         night_owls = {}
         early_birds = {}
-        for sender in sender_hourly.keys():
-            night_count = sum((sender_hourly[sender].get(hour, 0) for hour in range(22, 24))) + sum((sender_hourly[sender].get(hour, 0) for hour in range(0, 6)))
-            day_count = sum((sender_hourly[sender].get(hour, 0) for hour in range(6, 22)))
-            night_owls[sender] = night_count
-            early_birds[sender] = day_count
-        night_owl = max(night_owls.items(), key=lambda x: x[1])[0] if night_owls else 'Unknown'
-        early_bird = max(early_birds.items(), key=lambda x: x[1])[0] if early_birds else 'Unknown'
-        most_active_hour = max(hourly_counts.items(), key=lambda x: x[1])[0] if hourly_counts else 12
-        daily_counts = defaultdict(int)
-        for msg in messages:
-            day = msg['timestamp'].strftime('%A')
-            daily_counts[day] += 1
-        most_active_day = max(daily_counts.items(), key=lambda x: x[1])[0] if daily_counts else 'Monday'
-        late_night_messages = sum((hourly_counts.get(hour, 0) for hour in range(0, 4)))
+        for sender, hours in sender_hourly.items():
+            # Dense 24-slot histogram so every window below is a slice sum
+            histogram = [hours.get(hour, 0) for hour in range(24)]
+            day_count = sum(histogram[6:18])
+            night_count = sum(histogram) - day_count
+            if day_count:
+                day_night_counts[f'{sender}_day'] = day_count
+            if night_count:
+                day_night_counts[f'{sender}_night'] = night_count
+            night_owls[sender] = sum(histogram[22:]) + sum(histogram[:6])
+            early_birds[sender] = sum(histogram[6:22])
+        night_owl = max(night_owls, key=night_owls.get) if night_owls else 'Unknown'
+        early_bird = max(early_birds, key=early_birds.get) if early_birds else 'Unknown'
+        most_active_hour = max(hourly_counts, key=hourly_counts.get) if hourly_counts else 12
+        daily_counts = Counter((_DAY_NAMES[weekday] for weekday in prepared.weekdays))
+        most_active_day = max(daily_counts, key=daily_counts.get) if daily_counts else 'Monday'
+        late_night_messages = sum((hourly_counts[hour] for hour in range(0, 4)))
         return {'hourly_distribution': dict(hourly_counts), 'daily_distribution': dict(daily_counts), 'most_active_hour': most_active_hour, 'most_active_day': most_active_day, 'late_night_messages': late_night_messages, 'sender_hourly': {sender: dict(hours) for sender, hours in sender_hourly.items()}, 'day_night_counts': dict(day_night_counts), 'night_owl': night_owl, 'early_bird': early_bird, 'insight': 'Most deep conversations happen after 11pm' if hourly_counts and max(hourly_counts.values()) > sum(hourly_counts.values()) * 0.3 else 'Balanced day and night conversations'}
 
-    def _analyze_emotional_tone(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        positive_emojis = ['😊', '😄', '😃', '😁', '😆', '😂', '🤣', '😍', '🥰', '😘', '❤️', '💕', '💖', '💗', '💝', '✨', '🌟', '💫', '🌈', '🎉', '🎊', '👍', '👏', '🙌', '🔥', '💯', '😇', '🥺', '😌']
-        negative_emojis = ['😢', '😭', '😔', '😞', '😟', '😕', '🙁', '☹️', '😠', '😡', '😤', '😒', '😑', '😐', '😶', '💔', '😰', '😨', '😱', '😖', '😣', '😫', '😩']
-        positive_words = ['love', 'amazing', 'wonderful', 'great', 'awesome', 'fantastic', 'perfect', 'beautiful', 'sweet', 'cute', 'happy', 'excited', 'joy', 'smile', 'laugh', 'fun', 'good', 'best', 'excellent', 'brilliant', 'yay', 'yes', 'yeah', 'cool', 'nice']
-        negative_words = ['hate', 'terrible', 'awful', 'bad', 'sad', 'angry', 'upset', 'disappointed', 'frustrated', 'annoyed', 'worried', 'scared', 'hurt', 'pain', 'cry', 'sick', 'tired', 'bored', 'stupid', 'dumb', 'no', 'nope', 'ugh', 'ughh']
-        sender_sentiments = defaultdict(lambda: {'positive': 0, 'negative': 0, 'neutral': 0})
-        for msg in messages:
-            sender = msg['sender']
-            message = msg['message']
-            emojis = self.emoji_pattern.findall(message)
-            positive_emoji_count = sum((1 for emoji in emojis if emoji in positive_emojis))
-            negative_emoji_count = sum((1 for emoji in emojis if emoji in negative_emojis))
-            words = self._extract_words(message)
-            positive_word_count = sum((1 for word in words if word in positive_words))
-            negative_word_count = sum((1 for word in words if word in negative_words))
-            positive_score = positive_emoji_count + positive_word_count
-            negative_score = negative_emoji_count + negative_word_count
-            if positive_score > negative_score:
-                sender_sentiments[sender]['positive'] += 1
-            elif negative_score > positive_score:
-                sender_sentiments[sender]['negative'] += 1
-            else:
-                sender_sentiments[sender]['neutral'] += 1
+    def _analyze_emotional_tone(self, prepared: PreparedChat) -> Dict[str, Any]:
+        tone_counts = Counter()
+        for sender, words, emojis in zip(prepared.senders, prepared.words, prepared.emojis):
+            polarity = sum(map(_TONE_POLARITY.get, words, repeat(0))) + sum(map(_TONE_POLARITY.get, emojis, repeat(0)))
+            tone_counts[(sender, 'positive' if polarity > 0 else 'negative' if polarity < 0 else 'neutral')] += 1
         sentiment_percentages = {}
-        for sender, sentiments in sender_sentiments.items():
-            total = sum(sentiments.values())
-            if total > 0:
-                sentiment_percentages[sender] = {'positive': round(sentiments['positive'] / total * 100, 1), 'negative': round(sentiments['negative'] / total * 100, 1), 'neutral': round(sentiments['neutral'] / total * 100, 1)}
+        for sender, total in Counter(prepared.senders).items():
+            sentiment_percentages[sender] = {'positive': round(tone_counts[(sender, 'positive')] / total * 100, 1), 'negative': round(tone_counts[(sender, 'negative')] / total * 100, 1), 'neutral': round(tone_counts[(sender, 'neutral')] / total * 100, 1)}
         return {'sentiment_percentages': sentiment_percentages, 'overall_mood': self._calculate_overall_mood(sentiment_percentages), **sentiment_percentages}
 
     def _calculate_overall_mood(self, sentiment_percentages: Dict) -> str:
@@ -450,101 +416,62 @@ class ChatAnalyzer:
         else:
             return 'Neutral'
 
-    def _analyze_emoji_personality(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        emoji_counts = defaultdict(int)
-        sender_emojis = defaultdict(lambda: defaultdict(int))
-        total_emojis = 0
-        for msg in messages:
-            sender = msg['sender']
-            emojis = self.emoji_pattern.findall(msg['message'])
-            for emoji in emojis:
-                emoji_counts[emoji] += 1
-                sender_emojis[sender][emoji] += 1
-                total_emojis += 1
-        top_emojis = dict(Counter(emoji_counts).most_common(20))
+    def _analyze_emoji_personality(self, prepared: PreparedChat) -> Dict[str, Any]:
+        emoji_counts = Counter(chain.from_iterable(prepared.emojis))
+        pair_counts = Counter(((sender, emoji) for sender, emojis in zip(prepared.senders, prepared.emojis) for emoji in emojis))
+        sender_emojis = defaultdict(Counter)
+        for (sender, emoji), count in pair_counts.items():
+            sender_emojis[sender][emoji] = count
+        top_emojis = dict(emoji_counts.most_common(20))
         sender_emoji_totals = {sender: sum(counts.values()) for sender, counts in sender_emojis.items()}
         emoji_leaders = {}
         for sender, emojis in sender_emojis.items():
             if emojis:
-                top_emoji = max(emojis.items(), key=lambda x: x[1])[0]
-                emoji_leaders[sender] = {'top_emoji': top_emoji, 'count': emojis[top_emoji], 'total_emojis': sum(emojis.values())}
-        emoji_king = max(sender_emoji_totals.items(), key=lambda x: x[1])[0] if sender_emoji_totals else 'Unknown'
+                top_emoji, count = emojis.most_common(1)[0]
+                emoji_leaders[sender] = {'top_emoji': top_emoji, 'count': count, 'total_emojis': sender_emoji_totals[sender]}
+        emoji_king = max(sender_emoji_totals, key=sender_emoji_totals.get) if sender_emoji_totals else 'Unknown'
         return {'top_emojis': top_emojis, 'sender_emoji_totals': sender_emoji_totals, 'sender_emoji_counts': sender_emoji_totals, 'sender_emoji_details': {sender: dict(emojis) for sender, emojis in sender_emojis.items()}, 'emoji_leaders': emoji_leaders, 'emoji_king': emoji_king, 'title': f'{emoji_king} - Emoji King/Queen'}
 
-    def _analyze_keywords(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        all_words = []
-        sender_words = defaultdict(list)
+    def _analyze_keywords(self, prepared: PreparedChat) -> Dict[str, Any]:
+        word_freq = Counter()
+        sender_words = defaultdict(Counter)
         shared_words = set()
-        for msg in messages:
-            sender = msg['sender']
-            words = self._extract_words(msg['message'])
-            all_words.extend(words)
-            sender_words[sender].extend(words)
-        word_freq = Counter(all_words)
+        for sender, words in zip(prepared.senders, prepared.words):
+            word_freq.update(words)
+            sender_words[sender].update(words)
         common_words = dict(word_freq.most_common(50))
-        sender_common_words = {}
-        for sender, words in sender_words.items():
-            word_freq = Counter(words)
-            sender_common_words[sender] = dict(word_freq.most_common(20))
+        sender_common_words = {sender: dict(counts.most_common(20)) for sender, counts in sender_words.items()}
         if len(sender_words) == 2:
-            senders = list(sender_words.keys())
-            words1 = set(sender_words[senders[0]])
-            words2 = set(sender_words[senders[1]])
-            shared_words = words1.intersection(words2)
-        return {'overall_common_words': common_words, 'sender_common_words': sender_common_words, 'shared_words': list(shared_words)[:20], 'unique_words_per_sender': {sender: len(set(words)) for sender, words in sender_words.items()}}
+            words1, words2 = sender_words.values()
+            shared_words = words1.keys() & words2.keys()
+        return {'overall_common_words': common_words, 'sender_common_words': sender_common_words, 'shared_words': list(shared_words)[:20], 'unique_words_per_sender': {sender: len(counts) for sender, counts in sender_words.items()}}
 
-    def _find_milestones(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _find_milestones(self, prepared: PreparedChat) -> Dict[str, Any]:
+        messages = prepared.messages
         if not messages:
             return {}
         first_message = messages[0]
         last_message = messages[-1]
-        daily_counts = defaultdict(int)
-        for msg in messages:
-            date_key = msg['timestamp'].strftime('%Y-%m-%d')
-            daily_counts[date_key] += 1
-        most_active_day = max(daily_counts.items(), key=lambda x: x[1]) if daily_counts else ('', 0)
-        streaks = self._calculate_streaks(messages)
-        longest_streak = max(streaks, key=lambda x: x['length']) if streaks else {'length': 0, 'start': '', 'end': ''}
+        daily_counts = Counter(prepared.date_keys)
+        most_active_day = daily_counts.most_common(1)[0] if daily_counts else ('', 0)
+        streaks = self._calculate_streaks(prepared.date_keys)
+        longest_streak = max(streaks, key=itemgetter('length')) if streaks else {'length': 0, 'start': '', 'end': ''}
         return {'first_message': {'sender': first_message['sender'], 'message': first_message['message'][:100] + '...' if len(first_message['message']) > 100 else first_message['message'], 'timestamp': first_message['timestamp'].strftime('%Y-%m-%d %H:%M')}, 'most_active_day': {'date': most_active_day[0], 'message_count': most_active_day[1]}, 'longest_conversation_streak': longest_streak, 'total_days': len(daily_counts)}
 
-    def _calculate_streaks(self, messages: List[Dict[str, Any]]) -> List[Dict]:
+    def _calculate_streaks(self, date_keys: List[str]) -> List[Dict]:
         streaks = []
-        current_streak = 1
-        current_date = messages[0]['timestamp'].date()
-        streak_start = current_date
-        for i in range(1, len(messages)):
-            msg_date = messages[i]['timestamp'].date()
-            if msg_date == current_date:
-                current_streak += 1
-            else:
-                if current_streak > 1:
-                    streaks.append({'length': current_streak, 'start': streak_start.strftime('%Y-%m-%d'), 'end': current_date.strftime('%Y-%m-%d')})
-                current_streak = 1
-                current_date = msg_date
-                streak_start = msg_date
-        if current_streak > 1:
-            streaks.append({'length': current_streak, 'start': streak_start.strftime('%Y-%m-%d'), 'end': current_date.strftime('%Y-%m-%d')})
+        for date_key, run in groupby(date_keys):
+            length = len(list(run))
+            if length > 1:
+                streaks.append({'length': length, 'start': date_key, 'end': date_key})
         return streaks
 
-    def _calculate_affection_score(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        sender_scores = defaultdict(float)
-        sender_messages = defaultdict(int)
-        for msg in messages:
-            sender = msg['sender']
-            message = msg['message'].lower()
-            sender_messages[sender] += 1
-            words = self._extract_words(message)
-            affectionate_count = sum((1 for word in words if word in self.affectionate_words))
-            affectionate_emojis = ['❤️', '💕', '💖', '💗', '💘', '💝', '💞', '💟', '💌', '💋', '😍', '🥰', '😘', '🤗', '🤩', '😊', '😌', '🥺', '😇', '💯', '✨', '🌟', '💫', '🌈', '🦄', '🌸', '🌺', '🌻', '🌷', '🌹', '🌼', '💐', '🎀', '🎁', '💎', '🏆', '🥇', '👑', '💍']
-            emoji_count = sum((1 for emoji in self.emoji_pattern.findall(msg['message']) if emoji in affectionate_emojis))
-            message_length = len(words) if words else 1
-            score = (affectionate_count + emoji_count) / message_length
-            sender_scores[sender] += score
+    def _calculate_affection_score(self, sender_scores: Dict[str, float], message_counts: Counter) -> Dict[str, Any]:
         affection_scores = {}
         for sender, score in sender_scores.items():
-            message_count = sender_messages[sender]
+            message_count = message_counts[sender]
             affection_scores[sender] = round(score / message_count * 100, 1) if message_count > 0 else 0
-        most_affectionate = max(affection_scores.items(), key=lambda x: x[1])[0] if affection_scores else 'Unknown'
+        most_affectionate = max(affection_scores, key=affection_scores.get) if affection_scores else 'Unknown'
         return {'affection_scores': affection_scores, 'most_affectionate': most_affectionate, 'compatibility_gauge': self._calculate_compatibility_gauge(affection_scores)}
 
     def _calculate_compatibility_gauge(self, affection_scores: Dict) -> int:
@@ -560,26 +487,14 @@ class ChatAnalyzer:
         else:
             return max(20, int(avg_score * 5))
 
-    def _analyze_mood_timeline(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        daily_moods = defaultdict(lambda: {'positive': 0, 'negative': 0, 'neutral': 0})
-        positive_words = ['love', 'amazing', 'wonderful', 'great', 'awesome', 'fantastic', 'perfect', 'beautiful', 'sweet', 'cute', 'happy', 'excited', 'joy', 'smile', 'laugh', 'fun', 'good', 'best', 'excellent', 'brilliant']
-        negative_words = ['hate', 'terrible', 'awful', 'bad', 'sad', 'angry', 'upset', 'disappointed', 'frustrated', 'annoyed', 'worried', 'scared', 'hurt', 'pain', 'cry', 'sick', 'tired', 'bored', 'stupid', 'dumb']
-        for msg in messages:
-            date_key = msg['timestamp'].strftime('%Y-%m-%d')
-            words = self._extract_words(msg['message'])
-            positive_count = sum((1 for word in words if word in positive_words))
-            negative_count = sum((1 for word in words if word in negative_words))
-            if positive_count > negative_count:
-                daily_moods[date_key]['positive'] += 1
-            elif negative_count > positive_count:
-                daily_moods[date_key]['negative'] += 1
-            else:
-                daily_moods[date_key]['neutral'] += 1
+    def _analyze_mood_timeline(self, prepared: PreparedChat) -> Dict[str, Any]:
+        mood_counts = Counter()
+        for date_key, words in zip(prepared.date_keys, prepared.words):
+            polarity = sum(map(_MOOD_POLARITY.get, words, repeat(0)))
+            mood_counts[(date_key, 'positive' if polarity > 0 else 'negative' if polarity < 0 else 'neutral')] += 1
         timeline_data = []
-        for date, moods in sorted(daily_moods.items()):
-            total = sum(moods.values())
-            if total > 0:
-                timeline_data.append({'date': date, 'positive_ratio': round(moods['positive'] / total, 2), 'negative_ratio': round(moods['negative'] / total, 2), 'neutral_ratio': round(moods['neutral'] / total, 2)})
+        for day_key, total in sorted(Counter(prepared.date_keys).items()):
+            timeline_data.append({'date': day_key, 'positive_ratio': round(mood_counts[(day_key, 'positive')] / total, 2), 'negative_ratio': round(mood_counts[(day_key, 'negative')] / total, 2), 'neutral_ratio': round(mood_counts[(day_key, 'neutral')] / total, 2)})
         return {'timeline_data': timeline_data, 'overall_trend': self._calculate_mood_trend(timeline_data)}
 
     def _calculate_mood_trend(self, timeline_data: List[Dict]) -> str:
@@ -594,45 +509,46 @@ class ChatAnalyzer:
         else:
             return 'Mood is stable over time'
 
-    def _detect_topics(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        topic_keywords = {'work': ['work', 'job', 'office', 'meeting', 'project', 'boss', 'colleague', 'deadline', 'presentation'], 'food': ['food', 'eat', 'eating', 'hungry', 'restaurant', 'cooking', 'recipe', 'delicious', 'tasty', 'meal', 'dinner', 'lunch', 'breakfast'], 'travel': ['travel', 'trip', 'vacation', 'flight', 'hotel', 'beach', 'mountain', 'city', 'country', 'visit', 'explore'], 'entertainment': ['movie', 'film', 'show', 'series', 'music', 'song', 'book', 'game', 'fun', 'entertainment', 'watch', 'listen'], 'family': ['family', 'mom', 'dad', 'mother', 'father', 'sister', 'brother', 'parent', 'relative', 'home'], 'health': ['health', 'sick', 'ill', 'doctor', 'medicine', 'exercise', 'gym', 'fitness', 'pain', 'better', 'well'], 'shopping': ['buy', 'shopping', 'store', 'price', 'expensive', 'cheap', 'money', 'pay', 'card', 'cash'], 'technology': ['phone', 'computer', 'internet', 'app', 'software', 'tech', 'device', 'online', 'digital']}
-        topic_counts = defaultdict(int)
-        sender_topics = defaultdict(lambda: defaultdict(int))
-        for msg in messages:
-            sender = msg['sender']
-            words = self._extract_words(msg['message'])
-            for topic, keywords in topic_keywords.items():
-                topic_score = sum((1 for word in words if word in keywords))
-                if topic_score > 0:
-                    topic_counts[topic] += topic_score
-                    sender_topics[sender][topic] += topic_score
-        top_topics = dict(Counter(topic_counts).most_common(5))
+    def _detect_topics(self, prepared: PreparedChat) -> Dict[str, Any]:
+        topic_counts = Counter()
+        sender_topic_counts = Counter()
+        first_seen = {}
+        for index, (sender, words) in enumerate(zip(prepared.senders, prepared.words)):
+            for word in words:
+                topic = _TOPIC_BY_WORD.get(word)
+                if topic is None:
+                    continue
+                if topic not in first_seen:
+                    first_seen[topic] = index
+                topic_counts[topic] += 1
+                sender_topic_counts[(sender, topic)] += 1
+        sender_topics = defaultdict(dict)
+        for (sender, topic), count in sender_topic_counts.items():
+            sender_topics[sender][topic] = count
+        # Ties keep the first-mentioned topic first, with _TOPIC_KEYWORDS order inside a message
+        ordered_topics = sorted(topic_counts.items(), key=lambda item: (first_seen[item[0]], _TOPIC_RANK[item[0]]))
+        top_topics = dict(nlargest(5, ordered_topics, key=itemgetter(1)))
         return {'top_topics': top_topics, 'sender_topics': {sender: dict(topics) for sender, topics in sender_topics.items()}, 'summary': self._generate_topic_summary(top_topics)}
 
     def _generate_topic_summary(self, top_topics: Dict) -> str:
         if not top_topics:
             return 'No specific topics detected'
-        topics = list(top_topics.keys())[:3]
+        topics = islice(top_topics, 3)
         return f'You mostly talk about {', '.join(topics)}'
 
-    def _analyze_streaks_gaps(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_streaks_gaps(self, prepared: PreparedChat) -> Dict[str, Any]:
+        messages = prepared.messages
         if not messages:
             return {}
-        daily_activity = defaultdict(int)
-        for msg in messages:
-            date_key = msg['timestamp'].strftime('%Y-%m-%d')
-            daily_activity[date_key] += 1
-        dates = sorted(daily_activity.keys())
-        if len(dates) < 2:
+        days = sorted(set(prepared.days))
+        if len(days) < 2:
             return {'longest_streak': 0, 'longest_gap': 0}
         streaks = []
         gaps = []
         current_streak = 1
         current_gap = 0
-        for i in range(1, len(dates)):
-            prev_date = datetime.strptime(dates[i - 1], '%Y-%m-%d').date()
-            curr_date = datetime.strptime(dates[i], '%Y-%m-%d').date()
-            day_diff = (curr_date - prev_date).days
+        for prev_day, day in zip(days, days[1:]):
+            day_diff = day - prev_day
             if day_diff == 1:
                 current_streak += 1
                 if current_gap > 0:
@@ -652,17 +568,17 @@ class ChatAnalyzer:
         longest_gap = max(gaps) if gaps else 0
         return {'longest_streak': longest_streak, 'longest_gap': longest_gap, 'total_streaks': len(streaks), 'total_gaps': len(gaps), 'insight': f"You once didn't talk for {longest_gap} days straight" if longest_gap > 0 else 'No significant gaps found'}
 
-    def _calculate_compatibility_index(self, messages: List[Dict[str, Any]], message_counts: Counter, word_counts: Dict[str, int]) -> Dict[str, Any]:
+    def _calculate_compatibility_index(self, message_counts: Counter, word_counts: Dict[str, int], affection_scores: Dict[str, float], response_times: Dict[str, float]) -> Dict[str, Any]:
         if len(message_counts) < 2:
             return {'score': 50, 'description': 'Single person conversation'}
-        senders = list(message_counts.keys())
-        msg_balance = 1 - abs(message_counts[senders[0]] - message_counts[senders[1]]) / max(message_counts.values())
-        word_balance = 1 - abs(word_counts[senders[0]] - word_counts[senders[1]]) / max(word_counts.values())
-        affection_scores = self._calculate_affection_score(messages)['affection_scores']
-        affection_balance = 1 - abs(affection_scores[senders[0]] - affection_scores[senders[1]]) / max(affection_scores.values()) if max(affection_scores.values()) > 0 else 0.5
-        response_times = self._analyze_response_times_detailed(messages)['average_response_times']
+        first, second = list(message_counts.keys())[:2]
+        msg_balance = 1 - abs(message_counts[first] - message_counts[second]) / max(message_counts.values())
+        max_words = max(word_counts.values())
+        word_balance = 1 - abs(word_counts[first] - word_counts[second]) / max_words if max_words > 0 else 0.5
+        max_affection = max(affection_scores.values())
+        affection_balance = 1 - abs(affection_scores[first] - affection_scores[second]) / max_affection if max_affection > 0 else 0.5
         if len(response_times) >= 2:
-            time_balance = 1 - abs(response_times[senders[0]] - response_times[senders[1]]) / max(response_times.values())
+            time_balance = 1 - abs(response_times[first] - response_times[second]) / max(response_times.values())
         else:
             time_balance = 0.5
         compatibility_score = int((msg_balance + word_balance + affection_balance + time_balance) * 25)
@@ -676,7 +592,7 @@ class ChatAnalyzer:
             description = f"{compatibility_score}/100: Different communication styles, but that's okay!"
         return {'score': compatibility_score, 'description': description, 'factors': {'message_balance': round(msg_balance * 100, 1), 'word_balance': round(word_balance * 100, 1), 'affection_balance': round(affection_balance * 100, 1), 'response_balance': round(time_balance * 100, 1)}}
 
-    def _generate_personality_insights(self, messages: List[Dict[str, Any]], message_counts: Counter, word_counts: Dict[str, int]) -> Dict[str, Any]:
+    def _generate_personality_insights(self, message_counts: Counter, word_counts: Dict[str, int], emoji_stats: Dict[str, Any], affection_scores: Dict[str, float], time_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Generate personality insights without AI dependency"""
         senders = list(message_counts.keys())
         if len(senders) < 2:
@@ -703,7 +619,6 @@ class ChatAnalyzer:
         if verbose and concise:
             personality_insights.append(f'{verbose} writes detailed messages while {concise} keeps it brief')
         
-        emoji_stats = self._analyze_emoji_personality(messages)
         emoji_king = emoji_stats.get('emoji_king', senders[0])
         personality_insights.append(f'{emoji_king} is the emoji king/queen 👑')
         
@@ -713,14 +628,12 @@ class ChatAnalyzer:
         else:
             top_3_things.append('Complementary communication styles - different but harmonious')
         
-        affection_scores = self._calculate_affection_score(messages)['affection_scores']
         avg_affection = sum(affection_scores.values()) / len(affection_scores)
         if avg_affection > 5:
             top_3_things.append('High affection levels - lots of love and care in your messages')
         else:
             top_3_things.append('Steady friendship - consistent and reliable communication')
         
-        time_analysis = self._analyze_time_patterns(messages)
         night_owl = time_analysis.get('night_owl', senders[0])
         if night_owl:
             top_3_things.append(f'Late night conversations - {night_owl} keeps the chat alive after hours')
@@ -740,41 +653,41 @@ class ChatAnalyzer:
             'personality_insights': personality_insights
         }
 
-    def _analyze_who_thinks_first(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_who_thinks_first(self, prepared: PreparedChat) -> Dict[str, Any]:
+        messages = prepared.messages
         if not messages:
             return {}
         try:
-            daily_messages = defaultdict(list)
-            for msg in messages:
-                date_key = msg['timestamp'].strftime('%Y-%m-%d')
-                daily_messages[date_key].append(msg)
+            timestamps = prepared.timestamps
+            first_indices = {}
+            for i, date_key in enumerate(prepared.date_keys):
+                first = first_indices.get(date_key)
+                if first is None or timestamps[i] < timestamps[first]:
+                    first_indices[date_key] = i
             first_messages = {}
             daily_first_times = defaultdict(list)
-            for date, day_messages in daily_messages.items():
-                day_messages.sort(key=lambda x: x['timestamp'])
-                first_msg = day_messages[0]
-                first_messages[date] = {'sender': first_msg['sender'], 'time': first_msg['timestamp'].time().strftime('%H:%M:%S'), 'message': first_msg['message'][:50] + '...' if len(first_msg['message']) > 50 else first_msg['message']}
-                daily_first_times[first_msg['sender']].append(first_msg['timestamp'].time())
-            sender_first_counts = defaultdict(int)
-            for date_data in first_messages.values():
-                sender_first_counts[date_data['sender']] += 1
+            for day_key, first in first_indices.items():
+                first_msg = messages[first]
+                first_time = timestamps[first]
+                first_messages[day_key] = {'sender': first_msg['sender'], 'time': f'{first_time.hour:02d}:{first_time.minute:02d}:{first_time.second:02d}', 'message': first_msg['message'][:50] + '...' if len(first_msg['message']) > 50 else first_msg['message']}
+                daily_first_times[first_msg['sender']].append(first_time.hour * 60 + first_time.minute)
+            sender_first_counts = {sender: len(minutes) for sender, minutes in daily_first_times.items()}
             total_days = len(first_messages)
             sender_percentages = {}
             for sender, count in sender_first_counts.items():
                 sender_percentages[sender] = round(count / total_days * 100, 1) if total_days > 0 else 0
             avg_first_times = {}
-            for sender, times in daily_first_times.items():
-                if times:
-                    minutes = [t.hour * 60 + t.minute for t in times]
+            for sender, minutes in daily_first_times.items():
+                if minutes:
                     avg_minutes = sum(minutes) / len(minutes)
                     avg_hour = int(avg_minutes // 60)
                     avg_minute = int(avg_minutes % 60)
                     avg_first_times[sender] = f'{avg_hour:02d}:{avg_minute:02d}'
-            most_frequent_first = max(sender_first_counts.items(), key=lambda x: x[1])[0] if sender_first_counts else None
+            most_frequent_first = max(sender_first_counts, key=sender_first_counts.get) if sender_first_counts else None
             insights = self._generate_who_thinks_first_insights(sender_percentages, avg_first_times, most_frequent_first)
             calendar_data = []
-            for date, data in sorted(first_messages.items()):
-                calendar_data.append({'date': date, 'sender': data['sender'], 'time': data['time'][:5], 'message_preview': data['message']})
+            for day_key, data in sorted(first_messages.items()):
+                calendar_data.append({'date': day_key, 'sender': data['sender'], 'time': data['time'][:5], 'message_preview': data['message']})
             return {'daily_first_messages': dict(first_messages), 'sender_first_counts': dict(sender_first_counts), 'sender_percentages': sender_percentages, 'avg_first_times': avg_first_times, 'most_frequent_first': most_frequent_first, 'total_days_analyzed': total_days, 'calendar_data': calendar_data, 'insights': insights}
         except Exception as e:
             print(f'Error in _analyze_who_thinks_first: {e}')
@@ -1,12 +1,25 @@
+import glob
+import gzip
+import hashlib
+import io
 import json
 import logging
 import os
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 from config import Config
+from utils import AnalyticsCache
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback when the orjson wheel is unavailable
+    orjson = None
 
 # Lazy imports for serverless optimization
 _ChatParser = None
@@ -38,18 +51,57 @@ def _get_chart_generator():
 def _get_supabase_client():
     global _supabase_client
     if _supabase_client is None:
-        from supabase import create_client, Client
         SUPABASE_URL = os.getenv("SUPABASE_URL")
         SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+        # Only pay for the supabase import (and client setup) when storage is actually configured
         if SUPABASE_URL and SUPABASE_KEY:
+            from supabase import create_client
             _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
     return _supabase_client
 
+# Decoded sessions keyed by session_id + file mtime. Stored results make this a cold-path cache, and every
+# gunicorn worker holds its own copy, so it stays small. AnalyticsCache is not thread-safe; always use the lock.
+_session_cache = AnalyticsCache(max_size=4)
+_session_cache_lock = threading.Lock()
+
+# Off-request work such as the Supabase backup upload; worker threads are only started on first submit
+_background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chatlytics-bg')
+
 logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL), format=Config.LOG_FORMAT)
 
+class _OrjsonProvider(DefaultJSONProvider):
+    """jsonify() backed by orjson; keeps Flask's sorted keys and date/Decimal handling.
+
+    Not byte-identical to the stock provider: int keys sort as strings ("10" before "2"),
+    NaN/Infinity encode as null, and non-ASCII text is emitted as UTF-8 rather than \\u escapes.
+    """
+
+    def _options(self) -> int:
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        payload = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(payload, mimetype=self.mimetype)
+
 logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config.from_object(Config)
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
 
 # Only create upload folder if not on Vercel (Vercel filesystem is read-only except /tmp)
 try:
@@ -59,6 +111,24 @@ except OSError:
     logger.warning(f"Cannot create {app.config['UPLOAD_FOLDER']}, using /tmp instead")
     app.config['UPLOAD_FOLDER'] = '/tmp'
 
+def _results_version() -> str:
+    # Fingerprint of the code that renders and encodes stored results (app.py holds the JSON provider),
+    # so a deploy that changes either never serves stale output
+    digest = hashlib.sha1()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for module_file in ('analysis.py', 'visualization.py', 'utils.py', 'app.py'):
+        with open(os.path.join(base_dir, module_file), 'rb') as f:
+            digest.update(f.read())
+    digest.update(b'orjson' if orjson is not None else b'json')
+    return digest.hexdigest()[:12]
+
+# Per-session paths are formatted from templates built once, after the upload folder is settled
+_upload_dir = app.config['UPLOAD_FOLDER'].replace('%', '%%')
+_SESSION_PATH_FMT = os.path.join(_upload_dir, '%s_data.json.gz')
+_RESULTS_VERSION = _results_version()
+_RESULT_PATH_FMT = os.path.join(os.path.abspath(_upload_dir), f'%s_%s.{_RESULTS_VERSION}.json')
+_RESULT_KINDS = ('analytics', 'charts')
+
 @app.errorhandler(413)
 def request_entity_too_large(error):
     """Handle file too large errors"""
@@ -67,21 +137,115 @@ def request_entity_too_large(error):
         'error': 'File size exceeds 4MB limit. Please export your chat "Without Media" to reduce file size.'
     }), 413
 
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+_ALLOWED_EXTENSIONS = frozenset(app.config['ALLOWED_EXTENSIONS'])
+
 def allowed_file(filename: str) -> bool:
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in _ALLOWED_EXTENSIONS
+
+def _session_file_path(session_id: str) -> str:
+    return _SESSION_PATH_FMT % session_id
+
+def _stat_session_file(session_id: str) -> Tuple[str, os.stat_result]:
+    path = _SESSION_PATH_FMT % session_id
+    try:
+        return path, os.stat(path)
+    except FileNotFoundError:
+        # Sessions saved before compression was introduced are plain .json
+        return path[:-3], os.stat(path[:-3])
+
+def _read_session_file(session_file_path: str) -> Dict[str, Any]:
+    with (gzip.open if session_file_path.endswith('.gz') else open)(session_file_path, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def _read_session_data(session_id: str) -> Dict[str, Any]:
+    path = _SESSION_PATH_FMT % session_id
+    try:
+        return _read_session_file(path)
+    except FileNotFoundError:
+        return _read_session_file(path[:-3])
+
+def _write_bytes(file_path: str, payload: bytes) -> None:
+    # Write beside the target then rename, so readers never see a half-written file
+    tmp_path = f'{file_path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+            f.write(payload)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _write_session_file(session_file_path: str, session_data: Dict[str, Any]) -> None:
+    payload = orjson.dumps(session_data) if orjson is not None else json.dumps(session_data, ensure_ascii=False).encode('utf-8')
+    # Chat text compresses several-fold; level 1 keeps compression close to memcpy speed
+    _write_bytes(session_file_path, gzip.compress(payload, compresslevel=1))
+
+def _result_file_path(session_id: str, kind: str) -> str:
+    # Rendered API responses; sessions are immutable after upload, so each is computed once and then served from disk
+    return _RESULT_PATH_FMT % (session_id, kind)
+
+def _store_result(session_id: str, kind: str, messages: List[Dict[str, Any]]) -> bytes:
+    if kind == 'analytics':
+        result = _get_chat_analyzer().analyze_chat(messages)
+    else:
+        result = _get_chart_generator().generate_charts(messages)
+    payload = jsonify(result).get_data()
+    result_path = _result_file_path(session_id, kind)
+    _write_bytes(result_path, payload)
+    # Drop this session's results from earlier versions so each deploy does not leave a full set behind
+    stale_pattern = os.path.join(glob.escape(os.path.dirname(result_path)), f'{glob.escape(session_id)}_{kind}.*.json')
+    for stale_path in glob.glob(stale_pattern):
+        if stale_path != result_path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    return payload
+
+def _messages_to_columns(messages: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    # Column-oriented session layout: one array per field, senders dictionary-encoded as indices into 'senders'
+    senders = list(dict.fromkeys(msg['sender'] for msg in messages))
+    sender_ids = {sender: i for i, sender in enumerate(senders)}
+    return {
+        'timestamp': [msg['timestamp'].isoformat() for msg in messages],
+        'senders': senders,
+        'sender': [sender_ids[msg['sender']] for msg in messages],
+        'message': [msg['message'] for msg in messages],
+        'is_system': [msg['is_system'] for msg in messages]
+    }
+
+def _columns_to_messages(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    senders = columns['senders']
+    return [
+        {'timestamp': datetime.fromisoformat(timestamp), 'sender': senders[sender_id], 'message': message, 'is_system': is_system}
+        for timestamp, sender_id, message, is_system in zip(columns['timestamp'], columns['sender'], columns['message'], columns['is_system'])
+    ]
 
 def load_messages_from_session(session_id: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    session_file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{session_id}_data.json')
     logger.info(f'Loading session data for session_id: {session_id}')
     try:
-        with open(session_file_path, 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
-        messages_data = session_data['messages']
-        messages = []
-        for msg in messages_data:
-            message = {'timestamp': datetime.fromisoformat(msg['timestamp']), 'sender': msg['sender'], 'message': msg['message'], 'is_system': msg['is_system']}
-            messages.append(message)
+        session_file_path, session_stat = _stat_session_file(session_id)
+        cache_key = f'{session_id}:{session_stat.st_mtime_ns}'
+        with _session_cache_lock:
+            cached = _session_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f'Using cached session data for session {session_id}')
+            return cached
+        session_data = _read_session_file(session_file_path)
+        # The raw columns are popped so only the decoded messages stay alive (and cached) alongside the session metadata
+        if 'columns' in session_data:
+            messages = _columns_to_messages(session_data.pop('columns'))
+        else:
+            # Sessions written before the columnar layout
+            messages = [{'timestamp': datetime.fromisoformat(msg['timestamp']), 'sender': msg['sender'], 'message': msg['message'], 'is_system': msg['is_system']} for msg in session_data.pop('messages')]
         logger.info(f'Successfully loaded {len(messages)} messages for session {session_id}')
+        with _session_cache_lock:
+            _session_cache.set(cache_key, (messages, session_data))
         return (messages, session_data)
     except FileNotFoundError:
         logger.error(f'Session data file not found for session_id: {session_id}')
@@ -93,6 +257,34 @@ def load_messages_from_session(session_id: str) -> Tuple[List[Dict[str, Any]], D
         logger.error(f'Unexpected error loading session data: {e}')
         raise
 
+def _upload_to_supabase(payload: bytes, session_id: str, filename: str) -> None:
+    try:
+        supabase_client = _get_supabase_client()
+        if supabase_client:
+            bucket_name = os.getenv("SUPABASE_BUCKET", "chat-uploads")
+            res = supabase_client.storage.from_(bucket_name).upload(
+                f"{session_id}/{filename}",
+                payload
+            )
+            logger.info(f"File uploaded to Supabase bucket {bucket_name}: {res}")
+        else:
+            logger.info("Supabase not configured, skipping file upload")
+    except Exception as supa_err:
+        logger.error(f"Supabase upload failed: {supa_err}")
+
+def _prewarm_imports() -> None:
+    # Pay the lazy-import cost off the request path for long-running servers
+    try:
+        _get_chat_parser()
+        _get_chat_analyzer()
+        _get_chart_generator()
+        _get_supabase_client()
+    except Exception as e:
+        logger.warning(f'Import prewarm failed: {e}')
+
+def start_prewarm() -> None:
+    threading.Thread(target=_prewarm_imports, name='chatlytics-prewarm', daemon=True).start()
+
 @app.route('/')
 def index():
     logger.info('Home page accessed')
@@ -123,68 +315,51 @@ def upload_file():
         session_id = str(uuid.uuid4())
         logger.info(f'Processing upload for session: {session_id}')
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{session_id}_{filename}')
 
         try:
-            file.save(file_path)
-            logger.info(f'File saved locally: {file_path}')
+            # Only the parsed session is kept on disk; the raw export lives on in memory for the Supabase backup
+            payload = file.stream.read()
 
             parser = _get_chat_parser()
-            messages = parser.parse_file(file_path, filename)
+            messages = parser.parse_stream(io.BytesIO(payload), filename)
             if not messages:
                 logger.error(f'Failed to parse file: {filename}')
                 return jsonify({'error': 'Could not parse chat file. Please check the format.'}), 400
 
             logger.info(f'Successfully parsed {len(messages)} messages from {filename}')
 
-            serializable_messages = []
-            for msg in messages:
-                serializable_msg = {
-                    'timestamp': msg['timestamp'].isoformat(),
-                    'sender': msg['sender'],
-                    'message': msg['message'],
-                    'is_system': msg['is_system']
-                }
-                serializable_messages.append(serializable_msg)
-
             session_data = {
                 'session_id': session_id,
                 'filename': filename,
-                'messages': serializable_messages,
-                'file_path': file_path,
+                'columns': _messages_to_columns(messages),
                 'created_at': datetime.now().isoformat(),
                 'message_count': len(messages),
                 'storage_type': 'local'
             }
 
-            session_file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{session_id}_data.json')
-            with open(session_file_path, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2)
+            session_file_path = _session_file_path(session_id)
+            _write_session_file(session_file_path, session_data)
 
             logger.info(f'Session data saved for {session_id}')
 
-            # Upload to Supabase (if configured)
+            # The dashboard always follows an upload, so render its results now while the messages are in memory
             try:
-                supabase_client = _get_supabase_client()
-                if supabase_client:
-                    bucket_name = os.getenv("SUPABASE_BUCKET", "chat-uploads")
-                    with open(file_path, "rb") as f:
-                        res = supabase_client.storage.from_(bucket_name).upload(
-                            f"{session_id}/{filename}",
-                            f
-                        )
-                    logger.info(f"File uploaded to Supabase bucket {bucket_name}: {res}")
-                else:
-                    logger.info("Supabase not configured, skipping file upload")
-            except Exception as supa_err:
-                logger.error(f"Supabase upload failed: {supa_err}")
+                for kind in _RESULT_KINDS:
+                    _store_result(session_id, kind, messages)
+            except Exception as e:
+                logger.warning(f'Precomputing results failed for {session_id}, they will be built on request: {e}')
+
+            # Upload to Supabase (if configured) without holding up the response, except on Vercel,
+            # where the function is frozen once the response is sent and a background upload would be lost
+            if os.environ.get('VERCEL'):
+                _upload_to_supabase(payload, session_id, filename)
+            else:
+                _background_executor.submit(_upload_to_supabase, payload, session_id, filename)
 
             return jsonify({'success': True, 'session_id': session_id})
 
         except Exception as e:
             logger.error(f'Error processing file upload: {e}', exc_info=True)
-            if os.path.exists(file_path):
-                os.remove(file_path)
             return jsonify({'error': f'Error processing file: {str(e)}'}), 500
             
     except Exception as e:
@@ -196,9 +371,7 @@ def upload_file():
 def dashboard(session_id: str):
     logger.info(f'Dashboard access requested for session: {session_id}')
     try:
-        session_file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{session_id}_data.json')
-        with open(session_file_path, 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
+        session_data = _read_session_data(session_id)
         logger.info(f'Dashboard loaded successfully for session: {session_id}')
         return render_template('dashboard.html', session_id=session_id, filename=session_data['filename'])
     except FileNotFoundError:
@@ -212,11 +385,14 @@ def dashboard(session_id: str):
 def get_analytics(session_id: str):
     logger.info(f'Analytics requested for session: {session_id}')
     try:
+        result_path = _result_file_path(session_id, 'analytics')
+        if os.path.exists(result_path):
+            logger.info(f'Serving stored analytics for session: {session_id}')
+            return send_file(result_path, mimetype='application/json', conditional=True)
         messages, session_data = load_messages_from_session(session_id)
-        analyzer = _get_chat_analyzer()
-        analytics = analyzer.analyze_chat(messages)
+        payload = _store_result(session_id, 'analytics', messages)
         logger.info(f'Analytics generated successfully for session: {session_id}')
-        return jsonify(analytics)
+        return app.response_class(payload, mimetype='application/json')
     except FileNotFoundError:
         logger.error(f'Session not found for analytics: {session_id}')
         return (jsonify({'error': 'Session not found'}), 404)
@@ -229,11 +405,14 @@ def get_analytics(session_id: str):
 def get_charts(session_id: str):
     logger.info(f'Charts requested for session: {session_id}')
     try:
+        result_path = _result_file_path(session_id, 'charts')
+        if os.path.exists(result_path):
+            logger.info(f'Serving stored charts for session: {session_id}')
+            return send_file(result_path, mimetype='application/json', conditional=True)
         messages, session_data = load_messages_from_session(session_id)
-        chart_generator = _get_chart_generator()
-        charts = chart_generator.generate_charts(messages)
+        payload = _store_result(session_id, 'charts', messages)
         logger.info(f'Charts generated successfully for session: {session_id}')
-        return jsonify(charts)
+        return app.response_class(payload, mimetype='application/json')
     except FileNotFoundError:
         logger.error(f'Session not found for charts: {session_id}')
         return (jsonify({'error': 'Session not found'}), 404)
@@ -241,22 +420,56 @@ def get_charts(session_id: str):
         logger.error(f'Error generating charts for session {session_id}: {e}', exc_info=True)
         return (jsonify({'error': 'Failed to generate charts'}), 500)
 
+@app.route('/api/bundle/<session_id>')
+def get_bundle(session_id: str):
+    """Analytics and charts in one response, decoding the session at most once."""
+    logger.info(f'Bundle requested for session: {session_id}')
+    try:
+        messages = None
+        payloads = {}
+        stats = []
+        for kind in _RESULT_KINDS:
+            result_path = _result_file_path(session_id, kind)
+            try:
+                stats.append(os.stat(result_path))
+            except FileNotFoundError:
+                if messages is None:
+                    messages, session_data = load_messages_from_session(session_id)
+                payloads[kind] = _store_result(session_id, kind, messages)
+                stats.append(os.stat(result_path))
+        # Same validator inputs as send_file uses for the per-kind endpoints, so reloads revalidate with a 304
+        etag = '-'.join([_RESULTS_VERSION] + [f'{st.st_mtime_ns:x}-{st.st_size:x}' for st in stats])
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            parts = []
+            for kind in _RESULT_KINDS:
+                payload = payloads.get(kind)
+                if payload is None:
+                    with open(_result_file_path(session_id, kind), 'rb') as f:
+                        payload = f.read()
+                # Stored results are already encoded JSON, so they are spliced in rather than decoded and re-encoded
+                parts.append(b'"%s":%s' % (kind.encode('ascii'), payload))
+            response = app.response_class(b'{' + b','.join(parts) + b'}\n', mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        logger.info(f'Bundle served successfully for session: {session_id}')
+        return response
+    except FileNotFoundError:
+        logger.error(f'Session not found for bundle: {session_id}')
+        return (jsonify({'error': 'Session not found'}), 404)
+    except Exception as e:
+        logger.error(f'Error generating bundle for session {session_id}: {e}', exc_info=True)
+        return (jsonify({'error': 'Failed to generate dashboard data'}), 500)
+
 if __name__ == '__main__':
-    config_errors = Config.validate_config()
-    if config_errors and Config.is_production():
-        logger.error('Configuration validation failed:')
-        for error in config_errors:
-            logger.error(f'  - {error}')
-        logger.error('Please set the required environment variables')
-        exit(1)
-    elif config_errors:
-        logger.warning('Configuration issues detected (running in development mode):')
-        for error in config_errors:
-            logger.warning(f'  - {error}')
+    Config.check_server_config()
     
     logger.info(f'Starting Chatlytics application in {Config.ENV} mode')
     logger.info(f'Host: {Config.HOST}:{Config.PORT}')
     logger.info(f'Debug: {Config.DEBUG}')
+
+    start_prewarm()
     
     try:
         app.run(
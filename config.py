@@ -1,3 +1,4 @@
+import logging
 import os
 import secrets
 from typing import Dict, List, Set
@@ -5,6 +6,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class Config:    
     SECRET_KEY: str = os.environ.get('SECRET_KEY') or secrets.token_urlsafe(32)
     DEBUG: bool = os.environ.get('FLASK_ENV', 'production').lower() == 'development'
@@ -52,3 +55,18 @@ class Config:
     @classmethod
     def is_production(cls) -> bool:
         return cls.ENV.lower() == 'production'
+
+    @classmethod
+    def check_server_config(cls) -> None:
+        # Shared by `python app.py` and the gunicorn on_starting hook, which must not import app in the master
+        config_errors = cls.validate_config()
+        if config_errors and cls.is_production():
+            logger.error('Configuration validation failed:')
+            for error in config_errors:
+                logger.error(f'  - {error}')
+            logger.error('Please set the required environment variables')
+            raise SystemExit(1)
+        elif config_errors:
+            logger.warning('Configuration issues detected (running in development mode):')
+            for error in config_errors:
+                logger.warning(f'  - {error}')
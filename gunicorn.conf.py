@@ -0,0 +1,26 @@
+import multiprocessing
+import os
+
+# Production server settings: gunicorn app:app
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5001')}"
+
+# Analysis and chart rendering are CPU-bound, so parallelism comes from processes;
+# threads only cover the I/O waits (disk, Supabase backup) inside each worker
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+keepalive = 5
+timeout = 60
+
+
+def on_starting(server):
+    # Refuse to boot on a broken production config, as `python app.py` does. Only config is imported here:
+    # importing app in the master would preload it into every forked worker and pin old code across HUP reloads
+    from config import Config
+    Config.check_server_config()
+
+
+def post_worker_init(worker):
+    # Each worker imports the parser, analyzer and chart modules before its first request needs them
+    from app import start_prewarm
+    start_prewarm()
@@ -1,7 +1,8 @@
+import io
 import re
 import json
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO
 
 
 class ChatParser:
@@ -31,11 +32,14 @@ class ChatParser:
         }
 
     def parse_file(self, file_path: str, filename: str) -> List[Dict[str, Any]]:
+        with open(file_path, 'rb') as f:
+            return self.parse_stream(f, filename)
+
+    def parse_stream(self, stream: BinaryIO, filename: str) -> List[Dict[str, Any]]:
+        text = io.TextIOWrapper(stream, encoding='utf-8')
         if filename.endswith('.json'):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return self._parse_instagram_json(json.load(f))
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return self._parse_text_lines(f.readlines())
+            return self._parse_instagram_json(json.load(text))
+        return self._parse_text_lines(text.readlines())
 
     def _parse_text_lines(self, lines: List[str]) -> List[Dict[str, Any]]:
         messages, buffer, current = [], [], None
@@ -7,6 +7,10 @@ from functools import wraps
 from typing import Any, Dict, List, Optional
 logger = logging.getLogger(__name__)
 
+# One emoji per match (pictographs, dingbats, flags) plus an optional skin tone or VS16 selector,
+# so runs like '😂😂' count per emoji and '❤️' matches the analyzer vocabularies; shared by analysis and charts
+EMOJI_RE = re.compile('[\U0001F1E6-\U0001F1FF]{2}|[\u2600-\u27BF\u2B50\u2B55\U0001F000-\U0001FAFF](?:[\U0001F3FB-\U0001F3FF]|\uFE0F)?')
+
 def handle_errors(func):
 
     @wraps(func)
@@ -4,6 +4,7 @@ import re
 from collections import Counter, defaultdict
 from typing import List, Dict, Any
 from datetime import datetime
+from utils import EMOJI_RE
 
 # Global variables for lazy loading
 _go = None
@@ -219,12 +220,15 @@ class ChartGenerator:
     def _create_emoji_usage_chart(self, messages: List[Dict[str, Any]]) -> str:
         go, PlotlyJSONEncoder = _get_plotly()
         
-        emoji_pattern = re.compile('[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U000024C2-\U0001F251]+')
+        emoji_pattern = EMOJI_RE
         emoji_counts = Counter()
         total_emojis = 0
         
         for msg in messages:
-            emojis = emoji_pattern.findall(msg['message'])
+            text = msg['message']
+            if text.isascii():
+                continue
+            emojis = emoji_pattern.findall(text)
             emoji_counts.update(emojis)
             total_emojis += len(emojis)
         